@@ -6,6 +6,8 @@ from apps.authentication.controllers.permission_controller import permission_nam
 from apps.authentication.controllers.user_controller import user_namespace
 from apps.post.controllers.post_controller import post_namespace
 from apps.authentication.models.user_model import User
+from apps.authentication.models.role_model import Role
+from utils.change_feed import ensure_updated_at_columns
 from utils.exceptions import register_error_handlers  # Import your error handlers
 def create_app():
     app = Flask(__name__)
@@ -23,6 +25,9 @@ def create_app():
     # Create database tables
     with app.app_context():
         db.create_all()
+        ensure_updated_at_columns()
+        Role.ensure_closure_rows()
+        db.session.commit()
         User.create_temporary_superadmin()
 
     return app
@@ -1,7 +1,9 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request
+from extensions import db
 from apps.authentication.models.user_model import User
-from flask_jwt_extended import create_access_token, jwt_required
+from apps.authentication.models.revoked_token_model import RevokedToken
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt
 
 auth_namespace = Namespace('Auth (Both Admin-Panel & Frontend)', description="Authentication Operations")
 
@@ -50,3 +52,11 @@ class Login(Resource):
         return {'message': 'Invalid username or password. Please check your credentials and try again.'}, 401
 
 
+@auth_namespace.route('/logout')
+class Logout(Resource):
+    @jwt_required()
+    def post(self):
+        """Logout - revoke the access token used for this request"""
+        RevokedToken.revoke_token(get_jwt())
+        db.session.commit()
+        return {'message': 'Logged out successfully'}, 200
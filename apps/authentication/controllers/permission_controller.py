@@ -2,8 +2,11 @@ from flask_restx import Namespace, Resource, fields
 from flask import request
 from extensions import db
 from apps.authentication.models.permission_model import Permission
-from apps.authentication.models.role_model import Role
+from apps.authentication.models.role_model import Role, touch_roles_granting
 from apps.authentication.models.user_model import User, auth
+from apps.authentication.models.revoked_token_model import RevokedToken
+from utils.bulk_upsert import bulk_upsert
+from utils.change_feed import SINCE_PARAM_DESCRIPTION, LIMIT_PARAM_DESCRIPTION, change_feed, change_feed_model
 
 permission_namespace = Namespace('Permissions (Admin-Panel)', description="Permission Management Operations for Admins")
 
@@ -32,6 +35,18 @@ delete_permissions_model = permission_namespace.model('DeletePermissions', {
     'permission_ids': fields.List(fields.Integer, required=True, description='List of permission IDs to delete')
 })
 
+bulk_upsert_permissions_model = permission_namespace.model('BulkUpsertPermissions', {
+    'permissions': fields.List(fields.Nested(permission_request_model), required=True,
+                               description='Permissions to create, or update by name'),
+})
+
+bulk_upsert_response_model = permission_namespace.model('BulkUpsertResponse', {
+    'message': fields.String(description='Result message'),
+    'created': fields.Integer(description='Number of rows created'),
+    'updated': fields.Integer(description='Number of existing rows whose description changed'),
+    'unchanged': fields.Integer(description='Number of existing rows left as they were'),
+})
+
 @permission_namespace.route('/')
 class PermissionList(Resource):
     @permission_namespace.marshal_list_with(permission_response_model)
@@ -59,6 +74,28 @@ class PermissionList(Resource):
         return {'message': 'Permission created successfully'}, 201
 
 
+@permission_namespace.route('/bulk-upsert')
+class BulkUpsertPermissions(Resource):
+    @permission_namespace.expect(bulk_upsert_permissions_model, validate=True)
+    @permission_namespace.response(200, 'Permissions synced successfully', bulk_upsert_response_model)
+    @auth('permission_upsert')
+    def post(self):
+        """Create or update many permissions by name in one idempotent call"""
+        data = request.get_json()
+        permissions = data['permissions']
+
+        if not permissions:
+            return {'message': 'No permissions provided'}, 400
+
+        def touch_holders(created, updated):
+            if updated:  # Roles embed the changed descriptions
+                touch_roles_granting(db.session.connection(),
+                                     db.select(Permission.id).where(Permission.name.in_(updated)))
+
+        counts = bulk_upsert(Permission, permissions, after_chunk=touch_holders)
+        db.session.commit()
+        return {'message': 'Permissions synced successfully', **counts}, 200
+
 @permission_namespace.route('/<int:id>')
 class PermissionDetail(Resource):
     @permission_namespace.marshal_with(permission_response_model)
@@ -75,12 +112,26 @@ class PermissionDetail(Resource):
         """Update a permission"""
         data = request.get_json()
         permission = Permission.query.get_or_404(id)
+        if data['name'] != permission.name:
+            # Grants are matched by name, so holders lose the old one
+            RevokedToken.revoke_role_holder_tokens([role.id for role in permission.roles])
         permission.name = data['name']
         permission.description = data.get('description', permission.description)
         db.session.commit()
         return {'message': 'Permission updated successfully'}, 200
 
 
+@permission_namespace.route('/changes')
+class PermissionChanges(Resource):
+    @permission_namespace.param('since', SINCE_PARAM_DESCRIPTION)
+    @permission_namespace.param('limit', LIMIT_PARAM_DESCRIPTION)
+    @permission_namespace.response(200, 'Success', change_feed_model(permission_namespace, permission_response_model))
+    @auth('permission_changes')
+    def get(self):
+        """Permissions created, updated or deleted since a cursor"""
+        return change_feed(Permission.query, Permission, permission_response_model)
+
+
 @permission_namespace.route('/delete')
 class BulkDeletePermissions(Resource):
     @permission_namespace.expect(delete_permissions_model, validate=True)
@@ -98,6 +149,7 @@ class BulkDeletePermissions(Resource):
         if len(permissions) != len(permission_ids):
             return {'message': 'One or more permissions not found'}, 404
 
+        RevokedToken.revoke_role_holder_tokens([role.id for permission in permissions for role in permission.roles])
         for permission in permissions:
             db.session.delete(permission)
 
@@ -133,6 +185,8 @@ class AssignPermissions(Resource):
             if len(permissions) != len(permission_ids):
                 return {'message': f'One or more permissions not found for role with ID {role_id}'}, 404
 
+            if set(role.permissions) - set(permissions):
+                RevokedToken.revoke_role_holder_tokens([role.id])  # Demoted: existing tokens must not outlive the change
             role.permissions = permissions
             db.session.commit()
             return {'message': f'Permissions assigned successfully to role with ID {role_id}'}, 200
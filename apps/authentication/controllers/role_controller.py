@@ -1,9 +1,13 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from flask import request
 from extensions import db
 from apps.authentication.models.user_model import User, auth
 from apps.authentication.models.role_model import Role
-from apps.authentication.controllers.permission_controller import permission_response_model
+from apps.authentication.models.revoked_token_model import RevokedToken
+from apps.authentication.controllers.permission_controller import permission_response_model, bulk_upsert_response_model
+from utils.bulk_upsert import bulk_upsert
+from utils.change_feed import SINCE_PARAM_DESCRIPTION, LIMIT_PARAM_DESCRIPTION, change_feed, change_feed_model
+from utils.fieldsets import FIELDS_PARAM_DESCRIPTION, requested_fields, fieldset_options, fieldset_mask
 
 role_namespace = Namespace('Roles (Admin-Panel)', description="Role Management Operations for Admins")
 
@@ -11,6 +15,7 @@ role_namespace = Namespace('Roles (Admin-Panel)', description="Role Management O
 role_request_model = role_namespace.model('RoleRequest', {
     'name': fields.String(required=True, description='The role name'),
     'description': fields.String(description='A brief description of the role'),  # Added description
+    'parent_ids': fields.List(fields.Integer, description='IDs of parent roles whose permissions are inherited'),
 })
 
 assign_role_model = role_namespace.model('AssignRoles', {
@@ -27,6 +32,17 @@ role_response_model = role_namespace.model('RoleResponse', {
     'description': fields.String(description='A brief description of the role'),  # Added description
     'permissions': fields.List(fields.Nested(permission_response_model),
                                description='List of permissions associated with the role'),
+    'parents': fields.List(fields.Nested(role_namespace.model('ParentRoleResponse', {
+        'id': fields.Integer(readOnly=True, description='The unique identifier of a role'),
+        'name': fields.String(description='The role name'),
+    })), description='Direct parent roles whose permissions are inherited'),
+})
+
+bulk_upsert_roles_model = role_namespace.model('BulkUpsertRoles', {
+    'roles': fields.List(fields.Nested(role_namespace.model('RoleUpsert', {
+        'name': fields.String(required=True, description='The role name'),
+        'description': fields.String(description='A brief description of the role'),
+    })), required=True, description='Roles to create, or update by name'),
 })
 
 # Define Swagger model for deleting roles
@@ -35,16 +51,24 @@ delete_roles_model = role_namespace.model('DeleteRoles', {
 })
 
 
+def load_parent_roles(parent_ids):
+    parents = Role.query.filter(Role.id.in_(parent_ids)).all()
+    missing_parent_ids = set(parent_ids) - {parent.id for parent in parents}
+    if missing_parent_ids:
+        return None, ({'message': f"Parent roles with IDs {', '.join(map(str, missing_parent_ids))} do not exist"}, 400)
+    return parents, None
+
+
 @role_namespace.route('/')
 class RoleList(Resource):
-    @role_namespace.marshal_list_with(role_response_model)
+    @role_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @role_namespace.response(200, 'Success', [role_response_model])
     @auth('role_list')
     def get(self):
         """List all roles"""
-        roles = Role.query.all()
-        for role in roles:
-            role.permissions = role.permissions  # Ensure permissions are loaded
-        return roles  # `marshal_list_with` handles serialization
+        role_fields = requested_fields(role_response_model)
+        roles = Role.query.options(*fieldset_options(Role, role_fields)).all()
+        return marshal(roles, role_response_model, mask=fieldset_mask(role_fields))
 
     @role_namespace.expect(role_request_model, validate=True)
     @auth('role_create')
@@ -57,21 +81,49 @@ class RoleList(Resource):
         if Role.query.filter_by(name=name).first():
             return {'message': 'Role already exists'}, 409
 
+        parents, error = load_parent_roles(data.get('parent_ids', []))
+        if error:
+            return error
+
         new_role = Role(name=name, description=description)
         db.session.add(new_role)
+        db.session.flush()  # Assigns the ID needed to link parents
+        new_role.set_parents(parents)
         db.session.commit()
         return {'message': 'Role created successfully'}, 201
 
 
+@role_namespace.route('/bulk-upsert')
+class BulkUpsertRoles(Resource):
+    @role_namespace.expect(bulk_upsert_roles_model, validate=True)
+    @role_namespace.response(200, 'Roles synced successfully', bulk_upsert_response_model)
+    @auth('role_upsert')
+    def post(self):
+        """Create or update many roles by name in one idempotent call"""
+        data = request.get_json()
+        roles = data['roles']
+
+        if not roles:
+            return {'message': 'No roles provided'}, 400
+
+        def add_closure_rows(created, updated):
+            if created:
+                Role.ensure_closure_rows(created)  # Rows inserted in bulk skip the ORM after_insert hook
+
+        counts = bulk_upsert(Role, roles, after_chunk=add_closure_rows)
+        db.session.commit()
+        return {'message': 'Roles synced successfully', **counts}, 200
+
 @role_namespace.route('/<int:role_id>')
 class RoleDetail(Resource):
-    @role_namespace.marshal_with(role_response_model)
+    @role_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @role_namespace.response(200, 'Success', role_response_model)
     @auth('role_detail')
     def get(self, role_id):
         """Get a specific role by ID"""
-        role = Role.query.get_or_404(role_id)
-        role.permissions = role.permissions  # Ensure permissions are loaded
-        return role  # `marshal_with` handles serialization
+        role_fields = requested_fields(role_response_model)
+        role = Role.query.options(*fieldset_options(Role, role_fields)).get_or_404(role_id)
+        return marshal(role, role_response_model, mask=fieldset_mask(role_fields))
 
     @role_namespace.expect(role_request_model, validate=True)
     @auth('role_update')
@@ -82,10 +134,36 @@ class RoleDetail(Resource):
         role.name = data['name']
         role.description = data.get('description', role.description)  # Update description if provided
 
+        if 'parent_ids' in data:
+            parents, error = load_parent_roles(data['parent_ids'])
+            if error:
+                return error
+            if set(role.parents) - set(parents):
+                RevokedToken.revoke_role_holder_tokens([role.id])  # Inherited grants may be lost
+            try:
+                role.set_parents(parents)
+            except ValueError as e:
+                db.session.rollback()
+                return {'message': str(e)}, 400
+
         db.session.commit()
         return {'message': 'Role updated successfully'}, 200
 
 
+@role_namespace.route('/changes')
+class RoleChanges(Resource):
+    @role_namespace.param('since', SINCE_PARAM_DESCRIPTION)
+    @role_namespace.param('limit', LIMIT_PARAM_DESCRIPTION)
+    @role_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @role_namespace.response(200, 'Success', change_feed_model(role_namespace, role_response_model))
+    @auth('role_changes')
+    def get(self):
+        """Roles created, updated or deleted since a cursor"""
+        role_fields = requested_fields(role_response_model)
+        query = Role.query.options(*fieldset_options(Role, role_fields))
+        return change_feed(query, Role, role_response_model, fieldset_mask(role_fields))
+
+
 @role_namespace.route('/delete')
 class BulkDeleteRoles(Resource):
     @role_namespace.expect(delete_roles_model, validate=True)
@@ -102,6 +180,8 @@ class BulkDeleteRoles(Resource):
         if len(roles) != len(role_ids):
             return {'message': 'One or more roles not found'}, 404
 
+        # Holders of a deleted role, and of the roles inheriting from it, are demoted
+        RevokedToken.revoke_role_holder_tokens(role_ids)
         for role in roles:
             db.session.delete(role)
 
@@ -136,6 +216,8 @@ class AssignRoles(Resource):
             if len(roles) != len(role_ids):
                 return {'message': f'One or more roles not found for user {user_id}'}, 404
 
+            if set(user.roles) - set(roles):
+                RevokedToken.revoke_user_tokens(user.id)  # Demoted: existing tokens must not outlive the change
             user.roles = roles
             db.session.commit()
             return {'message': f'Roles assigned successfully to user with ID {user_id}'}, 200
@@ -1,8 +1,11 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from flask import request
 from extensions import db
 from apps.authentication.models.user_model import User, auth
 from apps.authentication.models.role_model import Role
+from apps.authentication.models.revoked_token_model import RevokedToken
+from utils.change_feed import SINCE_PARAM_DESCRIPTION, LIMIT_PARAM_DESCRIPTION, change_feed, change_feed_model
+from utils.fieldsets import FIELDS_PARAM_DESCRIPTION, requested_fields, fieldset_options, fieldset_mask
 
 user_namespace = Namespace('Users (Admin-Panel)', description="User Management Operations for Admins | Create User API can be used at both end ")
 
@@ -32,12 +35,14 @@ delete_users_model = user_namespace.model('DeleteUsers', {
 
 @user_namespace.route('/')
 class UserList(Resource):
-    @user_namespace.marshal_list_with(user_response_model)
+    @user_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @user_namespace.response(200, 'Success', [user_response_model])
     @auth('user_list')
     def get(self):
         """List all users with their roles"""
-        users = User.query.all()
-        return users  # `marshal_list_with` handles serialization
+        user_fields = requested_fields(user_response_model)
+        users = User.query.options(*fieldset_options(User, user_fields)).all()
+        return marshal(users, user_response_model, mask=fieldset_mask(user_fields))
 
     @user_namespace.expect(user_request_model, validate=True)
     @auth('user_create')
@@ -72,13 +77,14 @@ class UserList(Resource):
 
 @user_namespace.route('/<int:user_id>')
 class UserDetail(Resource):
-    @user_namespace.marshal_with(user_response_model)
+    @user_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @user_namespace.response(200, 'Success', user_response_model)
     @auth('user_detail')
     def get(self, user_id):
         """Get a specific user by ID with their roles"""
-        user = User.query.get_or_404(user_id)
-        user.roles = [role for role in Role.query.filter(Role.users.any(User.id == user.id)).all()]
-        return user  # `marshal_with` handles serialization
+        user_fields = requested_fields(user_response_model)
+        user = User.query.options(*fieldset_options(User, user_fields)).get_or_404(user_id)
+        return marshal(user, user_response_model, mask=fieldset_mask(user_fields))
 
     @user_namespace.expect(user_request_model, validate=True)
     @auth('user_update')
@@ -91,12 +97,29 @@ class UserDetail(Resource):
             user._password_hash = data['password']  # Update the hashed password
 
         role_ids = data.get('role_ids', [])
-        user.roles = Role.query.filter(Role.id.in_(role_ids)).all()
+        roles = Role.query.filter(Role.id.in_(role_ids)).all()
+        if set(user.roles) - set(roles):
+            RevokedToken.revoke_user_tokens(user.id)  # Demoted: existing tokens must not outlive the change
+        user.roles = roles
 
         db.session.commit()
         return {'message': 'User updated successfully'}, 200
 
 
+@user_namespace.route('/changes')
+class UserChanges(Resource):
+    @user_namespace.param('since', SINCE_PARAM_DESCRIPTION)
+    @user_namespace.param('limit', LIMIT_PARAM_DESCRIPTION)
+    @user_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @user_namespace.response(200, 'Success', change_feed_model(user_namespace, user_response_model))
+    @auth('user_changes')
+    def get(self):
+        """Users created, updated or deleted since a cursor"""
+        user_fields = requested_fields(user_response_model)
+        query = User.query.options(*fieldset_options(User, user_fields))
+        return change_feed(query, User, user_response_model, fieldset_mask(user_fields))
+
+
 @user_namespace.route('/delete')
 class BulkDeleteUsers(Resource):
     @user_namespace.expect(delete_users_model, validate=True)
@@ -122,6 +145,7 @@ class BulkDeleteUsers(Resource):
             users_to_delete.append(user)
 
         for user in users_to_delete:
+            RevokedToken.revoke_user_tokens(user.id)
             db.session.delete(user)
 
         db.session.commit()
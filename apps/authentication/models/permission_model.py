@@ -1,4 +1,6 @@
 from extensions import db
+from datetime import datetime
+from utils.change_feed import track_changes
 
 
 class Permission(db.Model):
@@ -7,5 +9,8 @@ class Permission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
     description = db.Column(db.String(255), nullable=True)  # Add description field
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     roles = db.relationship('Role', secondary='role_permissions', back_populates='permissions')
 
+
+track_changes(Permission)
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from flask_jwt_extended.config import config as jwt_config
+from extensions import db, jwt
+from apps.authentication.models.role_model import user_roles, role_closure
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'  # Set the table name to 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=True)  # A single token...
+    user_id = db.Column(db.Integer, nullable=True)  # ...or every token of this user issued up to revoked_at
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # Workers sync by this
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Revoked tokens are expired by then anyway
+
+    @classmethod
+    def revoke_token(cls, jwt_payload):
+        expires_at = datetime.utcfromtimestamp(jwt_payload['exp'])
+        db.session.add(cls(jti=jwt_payload['jti'], expires_at=expires_at))
+        cls._after_revoke()
+
+    @classmethod
+    def revoke_user_tokens(cls, user_id):
+        """Revoke every token issued to the user so far, e.g. when the user is deleted or demoted"""
+        cls._revoke_users([user_id])
+
+    @classmethod
+    def revoke_role_holder_tokens(cls, role_ids):
+        """Revoke the tokens of every user holding one of these roles or a role inheriting from them,
+        e.g. when the roles lose permissions"""
+        user_ids = db.session.execute(
+            db.select(user_roles.c.user_id).distinct()
+            .join(role_closure, role_closure.c.descendant_id == user_roles.c.role_id)
+            .where(role_closure.c.ancestor_id.in_(role_ids))).scalars().all()
+        if user_ids:
+            cls._revoke_users(user_ids)
+
+    @classmethod
+    def _revoke_users(cls, user_ids):
+        revoked_at = datetime.utcnow()
+        db.session.add_all([cls(user_id=user_id, revoked_at=revoked_at,
+                                expires_at=revoked_at + jwt_config.access_expires) for user_id in user_ids])
+        cls._after_revoke()
+
+    @classmethod
+    def _after_revoke(cls):
+        # Written with the caller's commit; expired entries are dropped along the way
+        cls.query.filter(cls.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        token_blocklist.mark_stale()
+
+
+def _timestamp(utc_datetime):
+    return utc_datetime.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TokenBlocklist:
+    """Per-worker copy of revoked_tokens, so checking a token costs two dict lookups.
+
+    At most every JWT_BLOCKLIST_SYNC_INTERVAL seconds, rows revoked since the
+    previous sync are fetched, which is how revocations made by other gunicorn
+    workers propagate. Neither IDs nor revoked_at are assigned in commit order,
+    so each sync re-reads a trailing window of JWT_BLOCKLIST_SYNC_MARGIN seconds
+    to catch rows whose transaction committed late; re-applying a row is harmless.
+    Entries are dropped once they expire.
+    """
+
+    def __init__(self):
+        self._jtis = {}  # jti -> expires (epoch seconds)
+        self._users = {}  # user_id -> (revoked up to, expires)
+        self._synced_at = None  # UTC time the previous sync started
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def mark_stale(self):
+        self._next_sync = 0.0
+
+    def is_revoked(self, jwt_payload):
+        now = time.time()
+        if now >= self._next_sync:
+            self._sync(now)
+
+        jti_expires = self._jtis.get(jwt_payload['jti'])
+        if jti_expires is not None and jti_expires > now:
+            return True
+        user_entry = self._users.get(jwt_payload['sub'])
+        if user_entry is None or user_entry[1] <= now:
+            return False
+        issued_at = jwt_payload.get('issued_at')
+        if issued_at is None:
+            # Token from before the issued_at claim; iat has one-second resolution, so err on revoking
+            return jwt_payload['iat'] <= user_entry[0]
+        return issued_at < user_entry[0]
+
+    def _sync(self, now):
+        with self._lock:
+            if now < self._next_sync:
+                return  # Another thread synced meanwhile
+            config = current_app.config
+            sync_started = datetime.utcnow()
+            rows = RevokedToken.query.filter(RevokedToken.expires_at > sync_started)
+            if self._synced_at is not None:
+                window_start = self._synced_at - timedelta(seconds=config['JWT_BLOCKLIST_SYNC_MARGIN'])
+                rows = rows.filter(RevokedToken.revoked_at >= window_start)
+            for row in rows:
+                expires = _timestamp(row.expires_at)
+                if row.jti:
+                    self._jtis[row.jti] = expires
+                else:
+                    revoked_at = _timestamp(row.revoked_at)
+                    previous = self._users.get(row.user_id, (0.0, 0.0))
+                    self._users[row.user_id] = (max(previous[0], revoked_at), max(previous[1], expires))
+
+            self._jtis = {jti: expires for jti, expires in self._jtis.items() if expires > now}
+            self._users = {user_id: entry for user_id, entry in self._users.items() if entry[1] > now}
+            self._synced_at = sync_started
+            self._next_sync = now + config['JWT_BLOCKLIST_SYNC_INTERVAL']
+
+
+token_blocklist = TokenBlocklist()
+
+
+@jwt.additional_claims_loader
+def add_issued_at_claim(identity):
+    # Sub-second issue time, so a token issued right after a revocation in the same second stays valid
+    return {'issued_at': time.time()}
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    return token_blocklist.is_revoked(jwt_payload)
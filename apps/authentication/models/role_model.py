@@ -1,4 +1,8 @@
 from extensions import db
+from datetime import datetime
+from apps.authentication.models.permission_model import Permission
+from utils.change_feed import track_changes, touch
+from sqlalchemy import event, and_, exists, inspect
 
 
 class Role(db.Model):
@@ -7,9 +11,43 @@ class Role(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
     description = db.Column(db.String(255), nullable=True)  # Add description field
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     users = db.relationship('User', secondary='user_roles', back_populates='roles')
     permissions = db.relationship('Permission', secondary='role_permissions', back_populates='roles')
+    # Direct parents only; a role inherits every permission granted to its ancestors.
+    # Written through set_parents() so role_closure stays in sync.
+    parents = db.relationship('Role', secondary='role_parents',
+                              primaryjoin='Role.id == role_parents.c.role_id',
+                              secondaryjoin='Role.id == role_parents.c.parent_id',
+                              viewonly=True)
 
+    def set_parents(self, parents):
+        """Replace the direct parents of this role, updating role_closure incrementally"""
+        connection = db.session.connection()
+        current_ids = {parent.id for parent in self.parents}
+        new_ids = {parent.id for parent in parents}
+        for parent_id in current_ids - new_ids:
+            _unlink(connection, self.id, parent_id)
+        for parent_id in new_ids - current_ids:
+            _link(connection, self.id, parent_id)
+        if current_ids != new_ids:
+            self.updated_at = datetime.utcnow()  # role_parents is written directly, so no ORM event fires
+        db.session.expire(self, ['parents'])
+
+    @classmethod
+    def ensure_closure_rows(cls, names=None):
+        # Backfill the self row for roles created before role_closure existed, or inserted
+        # without the ORM (bulk upsert), optionally limited to the given role names. The caller commits.
+        has_self_row = exists().where(and_(role_closure.c.ancestor_id == cls.id,
+                                           role_closure.c.descendant_id == cls.id))
+        missing = db.select(cls.id.label('ancestor_id'), cls.id.label('descendant_id'), db.literal(1)) \
+            .where(~has_self_row)
+        if names is not None:
+            missing = missing.where(cls.name.in_(names))
+        db.session.execute(role_closure.insert().from_select(['ancestor_id', 'descendant_id', 'paths'], missing))
+
+
+track_changes(Role, relationships=['permissions'])
 
 # Association tables
 user_roles = db.Table('user_roles',
@@ -21,3 +59,116 @@ role_permissions = db.Table('role_permissions',
                             db.Column('role_id', db.Integer, db.ForeignKey('roles.id')),  # Reference to 'roles' table
                             db.Column('permission_id', db.Integer, db.ForeignKey('permissions.id'))
                             )
+
+role_parents = db.Table('role_parents',
+                        db.Column('role_id', db.Integer, db.ForeignKey('roles.id'), primary_key=True),
+                        db.Column('parent_id', db.Integer, db.ForeignKey('roles.id'), primary_key=True)
+                        )
+
+# Materialized transitive closure of role_parents, including one (role, role) row per role.
+# `paths` counts the distinct inheritance paths so removing one edge of a diamond keeps the others.
+role_closure = db.Table('role_closure',
+                        db.Column('ancestor_id', db.Integer, db.ForeignKey('roles.id'), primary_key=True),
+                        db.Column('descendant_id', db.Integer, db.ForeignKey('roles.id'), primary_key=True,
+                                  index=True),
+                        db.Column('paths', db.Integer, nullable=False, default=1)
+                        )
+
+
+def _closure_pairs(connection, role_id, parent_id):
+    # Every (ancestor of parent) x (descendant of role) pair gains or loses paths through this edge
+    ups = connection.execute(db.select(role_closure.c.ancestor_id, role_closure.c.paths)
+                             .where(role_closure.c.descendant_id == parent_id)).all()
+    downs = connection.execute(db.select(role_closure.c.descendant_id, role_closure.c.paths)
+                               .where(role_closure.c.ancestor_id == role_id)).all()
+    existing = dict(((a, d), paths) for a, d, paths in connection.execute(
+        db.select(role_closure.c.ancestor_id, role_closure.c.descendant_id, role_closure.c.paths)
+        .where(role_closure.c.ancestor_id.in_([a for a, _ in ups]))
+        .where(role_closure.c.descendant_id.in_([d for d, _ in downs]))))
+    pairs = {(a, d): up_paths * down_paths for a, up_paths in ups for d, down_paths in downs}
+    return pairs, existing
+
+
+def _update_paths(connection, rows):
+    if rows:
+        connection.execute(
+            role_closure.update()
+            .where(and_(role_closure.c.ancestor_id == db.bindparam('a'),
+                        role_closure.c.descendant_id == db.bindparam('d')))
+            .values(paths=db.bindparam('p')),
+            rows)
+
+
+def _link(connection, role_id, parent_id):
+    cycle = connection.execute(db.select(role_closure.c.paths).where(and_(
+        role_closure.c.ancestor_id == role_id, role_closure.c.descendant_id == parent_id))).first()
+    if role_id == parent_id or cycle:
+        raise ValueError(f'Role {parent_id} cannot be a parent of role {role_id}: hierarchy would contain a cycle')
+
+    connection.execute(role_parents.insert().values(role_id=role_id, parent_id=parent_id))
+    pairs, existing = _closure_pairs(connection, role_id, parent_id)
+    new_rows = [{'ancestor_id': a, 'descendant_id': d, 'paths': paths}
+                for (a, d), paths in pairs.items() if (a, d) not in existing]
+    if new_rows:
+        connection.execute(role_closure.insert(), new_rows)
+    _update_paths(connection, [{'a': a, 'd': d, 'p': existing[(a, d)] + paths}
+                               for (a, d), paths in pairs.items() if (a, d) in existing])
+
+
+def _unlink(connection, role_id, parent_id):
+    connection.execute(role_parents.delete().where(and_(role_parents.c.role_id == role_id,
+                                                        role_parents.c.parent_id == parent_id)))
+    pairs, existing = _closure_pairs(connection, role_id, parent_id)
+    _update_paths(connection, [{'a': a, 'd': d, 'p': existing[(a, d)] - paths}
+                               for (a, d), paths in pairs.items() if (a, d) in existing])
+    connection.execute(role_closure.delete().where(role_closure.c.paths <= 0))
+
+
+@event.listens_for(Role, 'after_insert')
+def _add_closure_self_row(mapper, connection, role):
+    connection.execute(role_closure.insert().values(ancestor_id=role.id, descendant_id=role.id, paths=1))
+
+
+@event.listens_for(Role, 'before_delete')
+def _remove_from_hierarchy(mapper, connection, role):
+    parent_ids = connection.execute(db.select(role_parents.c.parent_id)
+                                    .where(role_parents.c.role_id == role.id)).scalars().all()
+    child_ids = connection.execute(db.select(role_parents.c.role_id)
+                                   .where(role_parents.c.parent_id == role.id)).scalars().all()
+    descendant_ids = connection.execute(db.select(role_closure.c.descendant_id)
+                                        .where(and_(role_closure.c.ancestor_id == role.id,
+                                                    role_closure.c.descendant_id != role.id))).scalars().all()
+    if descendant_ids:
+        # Their parents and inherited permissions change, so the role change feed must report them
+        touch(connection, Role, descendant_ids)
+    for parent_id in parent_ids:
+        _unlink(connection, role.id, parent_id)
+    for child_id in child_ids:
+        _unlink(connection, child_id, role.id)
+    connection.execute(role_closure.delete().where(role_closure.c.descendant_id == role.id))
+
+
+@event.listens_for(Role, 'after_update')
+def _touch_children_on_rename(mapper, connection, role):
+    # Children embed their parents' names
+    if inspect(role).attrs.name.history.has_changes():
+        touch(connection, Role, db.select(role_parents.c.role_id).where(role_parents.c.parent_id == role.id))
+
+
+def touch_roles_granting(connection, permission_ids):
+    """Bump updated_at of the roles granting these permissions (a list of IDs or a select)"""
+    touch(connection, Role, db.select(role_permissions.c.role_id)
+          .where(role_permissions.c.permission_id.in_(permission_ids)))
+
+
+@event.listens_for(Permission, 'after_update')
+def _touch_roles_on_permission_update(mapper, connection, permission):
+    # Roles embed their permissions
+    state = inspect(permission)
+    if state.attrs.name.history.has_changes() or state.attrs.description.history.has_changes():
+        touch_roles_granting(connection, [permission.id])
+
+
+@event.listens_for(Permission, 'before_delete')
+def _touch_roles_on_permission_delete(mapper, connection, permission):
+    touch(connection, Role, [role.id for role in permission.roles])
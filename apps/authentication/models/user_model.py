@@ -1,4 +1,10 @@
 from extensions import db
+from apps.authentication.models.permission_model import Permission
+from apps.authentication.models.role_model import Role, user_roles, role_permissions, role_closure
+from utils.permissions import MatcherCache
+from utils.change_feed import track_changes, touch
+from sqlalchemy import event, inspect, func
+from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -7,6 +13,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Per worker; a user's matcher is rebuilt only when its grants version changes
+permission_matchers = MatcherCache()
+
 
 # User model
 class User(db.Model):
@@ -16,6 +25,7 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     _password_hash = db.Column('password', db.String(120), nullable=False)  # Store hashed password
     is_superadmin = db.Column(db.Boolean, default=False)  # Field for SuperAdmin status
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     roles = db.relationship('Role', secondary='user_roles', back_populates='users')
 
     @property
@@ -43,18 +53,41 @@ class User(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    def granted_permission_names(self):
+        # Single query over the association tables instead of walking roles -> permissions lazily.
+        # role_closure expands each assigned role to itself plus all of its ancestors.
+        rows = (db.session.query(Permission.name)
+                .join(role_permissions, role_permissions.c.permission_id == Permission.id)
+                .join(role_closure, role_closure.c.ancestor_id == role_permissions.c.role_id)
+                .join(user_roles, user_roles.c.role_id == role_closure.c.descendant_id)
+                .filter(user_roles.c.user_id == self.id)
+                .distinct())
+        return [name for name, in rows]
+
+    def grants_version(self):
+        # Any change to the user's roles, or to the permissions or parents of a role it inherits
+        # from, bumps updated_at of the user or of one of those roles (see track_changes and the
+        # role/permission listeners), so the newest of these timestamps versions the grants
+        roles_changed = (db.session.query(func.max(Role.updated_at))
+                         .join(role_closure, role_closure.c.ancestor_id == Role.id)
+                         .join(user_roles, user_roles.c.role_id == role_closure.c.descendant_id)
+                         .filter(user_roles.c.user_id == self.id)
+                         .scalar())
+        return self.updated_at, roles_changed
+
+    @property
+    def permission_matcher(self):
+        # auth() loads a fresh User on every request; the compiled matcher outlives it in permission_matchers
+        matcher = getattr(self, '_permission_matcher', None)
+        if matcher is None:
+            matcher = permission_matchers.get(self.id, self.grants_version(), self.granted_permission_names)
+            self._permission_matcher = matcher
+        return matcher
+
     def has_permission(self, permission_name):
         if self.is_superadmin:
             return True
-        for role in self.roles:
-            print("role----", role.id)
-
-            for permission in role.permissions:
-                print("permission----", permission)
-
-                if permission.name == permission_name:
-                    return True
-        return False
+        return self.permission_matcher.matches(permission_name)
 
     @classmethod
     def create_temporary_superadmin(cls):
@@ -71,6 +104,21 @@ class User(db.Model):
             # print("SuperAdmin already exists.")
 
 
+track_changes(User, relationships=['roles'])
+
+
+@event.listens_for(Role, 'after_update')
+def _touch_users_on_role_rename(mapper, connection, role):
+    # Users embed the names of their roles
+    if inspect(role).attrs.name.history.has_changes():
+        touch(connection, User, db.select(user_roles.c.user_id).where(user_roles.c.role_id == role.id))
+
+
+@event.listens_for(Role, 'before_delete')
+def _touch_users_on_role_delete(mapper, connection, role):
+    touch(connection, User, [user.id for user in role.users])
+
+
 # Check user login and as well permissions
 def auth(permission_name):
     def decorator(f):
@@ -1,9 +1,14 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from flask import request
+from sqlalchemy import func
+from sqlalchemy.orm import with_expression
+from werkzeug.exceptions import BadRequest
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from apps.authentication.models.user_model import User, auth
 from apps.post.models.post_model import Post
+from utils.change_feed import SINCE_PARAM_DESCRIPTION, LIMIT_PARAM_DESCRIPTION, change_feed, change_feed_model
+from utils.fieldsets import FIELDS_PARAM_DESCRIPTION, requested_fields, fieldset_options, fieldset_mask
 
 post_namespace = Namespace('Posts (Can Mimic a Frontend and Admin Both)', description="Operations related to posts")
 
@@ -19,17 +24,36 @@ post_response_model = post_namespace.model('PostResponse', {
     'title': fields.String(description='The title of the post'),
     'content': fields.String(description='The content of the post'),
     'author_id': fields.Integer(description='The ID of the post author'),
-    'created_at': fields.DateTime(description='The creation date of the post')
+    'created_at': fields.DateTime(description='The creation date of the post'),
+    'excerpt': fields.String(description='The first `excerpt_length` characters of the content (only if requested)'),
 })
 
+DEFAULT_EXCERPT_LENGTH = 200
+
+
+def post_query():
+    """Post query and marshalling mask for the requested sparse fieldset"""
+    post_fields = requested_fields(post_response_model, optional=['excerpt'])
+    query = Post.query.options(*fieldset_options(Post, post_fields))
+    if 'excerpt' in post_fields:
+        # Truncate in SQL so the full Text column never leaves the database
+        excerpt_length = request.args.get('excerpt_length', DEFAULT_EXCERPT_LENGTH, type=int)
+        if excerpt_length < 1:
+            raise BadRequest('excerpt_length must be at least 1')
+        query = query.options(with_expression(Post.excerpt, func.substr(Post.content, 1, excerpt_length)))
+    return query, fieldset_mask(post_fields)
+
+
 @post_namespace.route('/')
 class PostList(Resource):
     @auth('post_list')
-    @post_namespace.marshal_list_with(post_response_model)
+    @post_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @post_namespace.param('excerpt_length', f'Length of the `excerpt` field (default: {DEFAULT_EXCERPT_LENGTH})')
+    @post_namespace.response(200, 'Success', [post_response_model])
     def get(self):
         """Get all posts"""
-        posts = Post.query.all()
-        return posts  # `marshal_list_with` handles serialization
+        query, mask = post_query()
+        return marshal(query.all(), post_response_model, mask=mask)
 
     @post_namespace.expect(post_request_model, validate=True)
     @auth('post_create')
@@ -48,14 +72,29 @@ class PostList(Resource):
         return {'message': 'Post created successfully'}, 201
 
 
+@post_namespace.route('/changes')
+class PostChanges(Resource):
+    @auth('post_changes')
+    @post_namespace.param('since', SINCE_PARAM_DESCRIPTION)
+    @post_namespace.param('limit', LIMIT_PARAM_DESCRIPTION)
+    @post_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @post_namespace.response(200, 'Success', change_feed_model(post_namespace, post_response_model))
+    def get(self):
+        """Posts created, updated or deleted since a cursor"""
+        query, mask = post_query()
+        return change_feed(query, Post, post_response_model, mask)
+
+
 @post_namespace.route('/<int:post_id>')
 class PostDetail(Resource):
     @auth('post_detail')
-    @post_namespace.marshal_with(post_response_model)
+    @post_namespace.param('fields', FIELDS_PARAM_DESCRIPTION)
+    @post_namespace.param('excerpt_length', f'Length of the `excerpt` field (default: {DEFAULT_EXCERPT_LENGTH})')
+    @post_namespace.response(200, 'Success', post_response_model)
     def get(self, post_id):
         """Get a specific post by ID"""
-        post = Post.query.get_or_404(post_id)
-        return post  # `marshal_with` handles serialization
+        query, mask = post_query()
+        return marshal(query.get_or_404(post_id), post_response_model, mask=mask)
 
     @post_namespace.expect(post_request_model, validate=True)
     @auth('post_update')
@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime
+from utils.change_feed import track_changes
 
 class Post(db.Model):
     __tablename__ = 'posts'  # Set the table name to 'posts'
@@ -9,6 +10,11 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Update 'user.id' to 'users.id'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    excerpt = db.query_expression()  # Truncated content, only populated when a query asks for it
 
     def __repr__(self):
         return f'<Post {self.title}>'
+
+
+track_changes(Post)
@@ -0,0 +1,79 @@
+# CPU cost vs bytes saved for compressing realistic list payloads, plus the precompressed-cache hit path.
+# Run from the project root: python -m benchmarks.compression
+import gzip
+import json
+import random
+import timeit
+from flask import Flask
+from utils.compression import Compress, brotli
+
+WORDS = ('role permission post user admin assign list create update delete content title '
+         'the of and to in is for on with as by at from').split()
+RUNS = 20
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def post_list(count, rng):
+    return [{'id': i, 'title': sentence(rng, 6), 'content': ' '.join(sentence(rng, 15) for _ in range(20)),
+             'author_id': rng.randint(1, 50), 'created_at': '2024-09-11T19:00:02.349687'} for i in range(count)]
+
+
+def user_list(count, rng):
+    return [{'id': i, 'is_superadmin': False, 'username': f'user{i}',
+             'roles': [{'id': r, 'name': f'role{r}'} for r in rng.sample(range(200), 5)]} for i in range(count)]
+
+
+def measure(label, payload):
+    body = json.dumps(payload).encode()
+    print(f'{label}: {len(body) / 1024:.1f} KiB')
+    codecs = [(f'gzip-{level}', lambda level=level: gzip.compress(body, compresslevel=level, mtime=0))
+              for level in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [(f'br-{quality}', lambda quality=quality: brotli.compress(body, quality=quality))
+                   for quality in (1, 4, 11)]
+    for name, compress in codecs:
+        seconds = timeit.timeit(compress, number=RUNS) / RUNS
+        size = len(compress())
+        print(f'  {name:8} {seconds * 1000:7.2f} ms  {size / 1024:7.1f} KiB  saved {1 - size / len(body):6.1%}')
+
+
+def measure_cache(payload):
+    app = Flask(__name__)
+    Compress(app)
+
+    @app.route('/')
+    def index():
+        return app.response_class(json.dumps(payload), mimetype='application/json')
+
+    client = app.test_client()
+    headers = {'Accept-Encoding': 'gzip'}
+
+    def uncached():
+        app.config['COMPRESS_CACHE_SIZE'] = 0
+        client.get('/', headers=headers)
+
+    def cached():
+        app.config['COMPRESS_CACHE_SIZE'] = 128
+        client.get('/', headers=headers)
+
+    cached()  # Warm the cache
+    print('request round trip (gzip-6):')
+    print(f'  compress every time : {timeit.timeit(uncached, number=RUNS) / RUNS * 1000:7.2f} ms')
+    print(f'  precompressed cache : {timeit.timeit(cached, number=RUNS) / RUNS * 1000:7.2f} ms')
+
+
+def main():
+    rng = random.Random(0)
+    posts = post_list(500, rng)
+    measure('PostList, 500 posts', posts)
+    measure('UserList, 1000 users', user_list(1000, rng))
+    if brotli is None:
+        print('(brotli not installed, skipped)')
+    measure_cache(posts)
+
+
+if __name__ == '__main__':
+    main()
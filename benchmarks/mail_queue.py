@@ -0,0 +1,68 @@
+# Deliver mail through MailQueue to a local SMTP debugging server and check it all arrives over one
+# connection, compared with sending each message synchronously. Needs aiosmtpd (pip install aiosmtpd).
+# Run from the project root: python -m benchmarks.mail_queue
+import time
+from aiosmtpd.controller import Controller
+from flask import Flask
+from flask_mail import Mail, Message
+from utils.mail_queue import MailQueue
+
+MESSAGES = 200
+PORT = 8025
+
+
+class CountingHandler:
+    def __init__(self):
+        self.recipients = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        self.sessions.add(session)  # aiosmtpd creates one session per SMTP connection
+        return '250 OK'
+
+
+def message(i):
+    return Message(subject=f'Message {i}', recipients=[f'user{i}@example.com'], body='Hello')
+
+
+def main():
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=PORT)
+    controller.start()
+
+    app = Flask(__name__)
+    app.config.update({'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': PORT, 'MAIL_USE_TLS': False,
+                       'MAIL_DEFAULT_SENDER': 'bench@example.com'})
+    mail = Mail(app)
+    mail_queue = MailQueue(mail, app)
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            for i in range(MESSAGES):
+                mail.send(message(i))
+            synchronous = time.perf_counter() - started
+            sync_sessions = len(handler.sessions)
+
+            handler.recipients.clear()
+            handler.sessions.clear()
+            started = time.perf_counter()
+            for i in range(MESSAGES):
+                mail_queue.send(message(i))
+            enqueued = time.perf_counter() - started
+            mail_queue.join()
+            delivered = time.perf_counter() - started
+    finally:
+        mail_queue.shutdown()
+        controller.stop()
+
+    assert len(handler.recipients) == MESSAGES, f'{len(handler.recipients)} of {MESSAGES} messages delivered'
+    assert len(handler.sessions) == 1, f'{len(handler.sessions)} SMTP sessions used'
+    print(f'{MESSAGES} messages to a local SMTP server:')
+    print(f'  mail.send        : {synchronous * 1000:8.2f} ms in requests ({sync_sessions} connections)')
+    print(f'  mail_queue.send  : {enqueued * 1000:8.2f} ms in requests, delivered after {delivered * 1000:.2f} ms '
+          f'over {len(handler.sessions)} connection')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Compare the compiled permission matcher with the old nested role/permission loop.
+# Run from the project root: python -m benchmarks.permission_matching
+import timeit
+from flask import Flask
+from extensions import db
+from apps.authentication.models.user_model import User, permission_matchers
+from apps.authentication.models.role_model import Role
+from apps.authentication.models.permission_model import Permission
+from apps.post.models.post_model import Post  # noqa: F401 - registers the posts table
+
+ROLE_COUNT = 300
+PERMISSIONS_PER_ROLE = 5
+RUNS = 20
+
+
+def legacy_has_permission(user, permission_name):
+    for role in user.roles:
+        for permission in role.permissions:
+            if permission.name == permission_name:
+                return True
+    return False
+
+
+def seed():
+    permissions = [Permission(name=f'resource{i}_action{j}')
+                   for i in range(ROLE_COUNT) for j in range(PERMISSIONS_PER_ROLE)]
+    user = User(username='bench', is_superadmin=False)
+    user.password = 'bench'
+    for i in range(ROLE_COUNT):
+        role = Role(name=f'role{i}')
+        role.permissions = permissions[i * PERMISSIONS_PER_ROLE:(i + 1) * PERMISSIONS_PER_ROLE]
+        user.roles.append(role)
+    # A couple of wildcard grants on the last role
+    user.roles[-1].permissions.extend([Permission(name='post_*'), Permission(name='*_list')])
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def main():
+    app = Flask(__name__)
+    app.config.update({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_TRACK_MODIFICATIONS': False})
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user_id = seed()
+        # Worst case for the loop: the permission lives on the last role
+        target = f'resource{ROLE_COUNT - 1}_action{PERMISSIONS_PER_ROLE - 1}'
+
+        def fresh_user():
+            db.session.expire_all()
+            return User.query.get(user_id)
+
+        def run_legacy():
+            assert legacy_has_permission(fresh_user(), target)
+
+        def run_compiled():
+            assert fresh_user().has_permission(target)
+
+        def run_compiled_cold():
+            permission_matchers.clear()
+            run_compiled()
+
+        legacy = timeit.timeit(run_legacy, number=RUNS) / RUNS
+        cold = timeit.timeit(run_compiled_cold, number=RUNS) / RUNS
+        cached = timeit.timeit(run_compiled, number=RUNS) / RUNS
+        print(f'{ROLE_COUNT} roles x {PERMISSIONS_PER_ROLE} permissions, per request (load user + check):')
+        print(f'  nested loop        : {legacy * 1000:8.2f} ms')
+        print(f'  compiled, rebuilt  : {cold * 1000:8.2f} ms')
+        print(f'  compiled, cached   : {cached * 1000:8.2f} ms')
+
+        user = fresh_user()
+        matcher = user.permission_matcher
+        names = [target, 'post_delete', 'role_list', 'missing_permission']
+        lookups = timeit.timeit(lambda: [matcher.matches(name) for name in names], number=10000)
+        print(f'  matcher lookup: {lookups / (10000 * len(names)) * 1e6:.2f} us per check (exact/prefix/suffix/miss)')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ from flask_migrate import Migrate
 from flask_restx import Api
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from utils.compression import Compress
+from utils.mail_queue import MailQueue
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -25,6 +27,8 @@ api = Api(
 
 jwt = JWTManager()
 mail = Mail()
+mail_queue = MailQueue(mail)  # Use mail_queue.send() in requests; it never blocks on SMTP
+compress = Compress()
 
 
 def init_extensions(app):
@@ -39,13 +43,30 @@ def init_extensions(app):
         'JWT_SECRET_KEY': 'c847f85238de4896ace70957901f6fb6be6709971547cba8523c1f9d8e236b3a',
         # Replace with your own secret key
         'JWT_ACCESS_TOKEN_EXPIRES': 86400,  # Token expiration time in seconds (24 hours)
+        'JWT_BLOCKLIST_SYNC_INTERVAL': 5,  # Seconds between each worker's fetch of newly revoked tokens
+        'JWT_BLOCKLIST_SYNC_MARGIN': 60,  # Seconds re-read on every sync; must exceed the longest transaction
         # flask_mail
         'MAIL_SERVER': 'smtp.example.com',
         'MAIL_PORT': 587,
         'MAIL_USERNAME': 'your_email@example.com',
         'MAIL_PASSWORD': 'your_password',
         'MAIL_USE_TLS': True,
-        'MAIL_USE_SSL': False
+        'MAIL_USE_SSL': False,
+        'MAIL_DEFAULT_SENDER': 'your_email@example.com',
+        # background mail queue
+        'MAIL_QUEUE_MAXSIZE': 1000,  # Pending messages per worker before send() raises MailQueueFull
+        'MAIL_QUEUE_BATCH_SIZE': 50,  # Messages sent per SMTP connection round
+        'MAIL_QUEUE_MAX_RETRIES': 3,
+        'MAIL_QUEUE_RETRY_BACKOFF': 2.0,  # Seconds, doubled after every failed attempt
+        'MAIL_QUEUE_IDLE_TIMEOUT': 30.0,  # Seconds an unused SMTP connection stays open
+        'MAIL_QUEUE_SHUTDOWN_TIMEOUT': 30.0,  # Seconds a stopping worker waits to flush queued mail
+        # change feeds: hold back changes this recent (seconds) so late commits aren't skipped
+        'CHANGE_FEED_SAFETY_LAG': 10,
+        # response compression (brotli is used when the package is installed)
+        'COMPRESS_MIN_SIZE': 500,  # Don't compress bodies smaller than this (bytes)
+        'COMPRESS_LEVEL': 6,
+        'COMPRESS_BR_LEVEL': 4,
+        'COMPRESS_CACHE_SIZE': 128,
     })
 
     # Initialize extensions with app
@@ -54,3 +75,5 @@ def init_extensions(app):
     api.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
+    mail_queue.init_app(app)
+    compress.init_app(app)
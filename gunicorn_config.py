@@ -1,3 +1,9 @@
 bind = "0.0.0.0:8005"
 workers = 4
-loglevel = "info"
\ No newline at end of file
+loglevel = "info"
+
+
+def worker_exit(server, worker):
+    # Flush mail still queued in this worker before it goes away
+    from extensions import mail_queue
+    mail_queue.shutdown()
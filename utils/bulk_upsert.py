@@ -0,0 +1,53 @@
+from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.exceptions import NotImplemented as HTTPNotImplemented
+from extensions import db
+
+# 3 bound parameters per row keeps each statement under SQLite's historical 999-variable limit
+CHUNK_SIZE = 200
+
+_DIALECT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def bulk_upsert(model_cls, items, key='name', column='description', after_chunk=None):
+    """Create or update `model_cls` rows by their unique `key` with one INSERT ... ON CONFLICT per chunk.
+
+    Items without `column` only create missing rows and never overwrite an existing value.
+    `after_chunk(created, updated)` is called with the keys written by each chunk, so follow-up
+    statements stay within the same parameter limit. Returns the created/updated/unchanged counts.
+    The caller commits.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in _DIALECT_INSERTS:
+        raise HTTPNotImplemented(f'Bulk upsert is not supported on the {dialect} database backend')
+    insert = _DIALECT_INSERTS[dialect]
+    table = model_cls.__table__
+
+    # Later duplicates win, like applying the items one by one would
+    values = {item[key]: item.get(column) for item in items}
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    keys = list(values)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = keys[start:start + CHUNK_SIZE]
+        existing = dict(db.session.execute(
+            db.select(table.c[key], table.c[column]).where(table.c[key].in_(chunk))).all())
+        created = [name for name in chunk if name not in existing]
+        updated = [name for name in chunk if name in existing
+                   and values[name] is not None and values[name] != existing[name]]
+        counts['created'] += len(created)
+        counts['updated'] += len(updated)
+        counts['unchanged'] += len(chunk) - len(created) - len(updated)
+
+        now = datetime.utcnow()
+        statement = insert(table).values([{key: name, column: values[name], 'updated_at': now} for name in chunk])
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: statement.excluded[column], 'updated_at': now},
+            # Leave matching rows untouched so their updated_at (and the change feed) stays quiet
+            where=and_(statement.excluded[column].isnot(None),
+                       or_(table.c[column].is_(None), table.c[column] != statement.excluded[column])))
+        db.session.execute(statement)
+        if after_chunk is not None:
+            after_chunk(created, updated)
+    return counts
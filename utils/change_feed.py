@@ -0,0 +1,152 @@
+import base64
+from datetime import datetime, timedelta
+from flask import current_app, request
+from flask_restx import fields, marshal
+from sqlalchemy import event, and_, or_, true, false, func, inspect, text
+from sqlalchemy.orm import undefer
+from werkzeug.exceptions import BadRequest
+from extensions import db
+
+DEFAULT_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1000
+
+SINCE_PARAM_DESCRIPTION = 'Cursor returned as `next_cursor` by the previous call (omit for a full sync)'
+LIMIT_PARAM_DESCRIPTION = f'Maximum number of changes to return (default: {DEFAULT_BATCH_SIZE}, max: {MAX_BATCH_SIZE})'
+
+# Rows and tombstones share one ordering: (timestamp, kind, id)
+_UPSERT, _DELETE = 0, 1
+
+_tracked_models = []
+
+
+class Tombstone(db.Model):
+    __tablename__ = 'tombstones'  # One row per deleted object, so change feeds can report deletes
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(80), nullable=False)
+    object_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index('ix_tombstones_table_name_deleted_at', 'table_name', 'deleted_at', 'object_id'),)
+
+
+def track_changes(model_cls, relationships=()):
+    """Record a tombstone when a `model_cls` row is deleted and bump `updated_at`
+    when one of the given relationship collections changes (the row itself isn't UPDATEd then)."""
+    _tracked_models.append(model_cls)
+
+    @event.listens_for(model_cls, 'after_delete')
+    def _add_tombstone(mapper, connection, target):
+        connection.execute(Tombstone.__table__.insert().values(
+            table_name=model_cls.__tablename__, object_id=target.id, deleted_at=datetime.utcnow()))
+
+    def _touch(target, *args):
+        target.updated_at = datetime.utcnow()
+
+    for name in relationships:
+        event.listen(getattr(model_cls, name), 'append', _touch)
+        event.listen(getattr(model_cls, name), 'remove', _touch)
+
+
+def touch(connection, model_cls, ids):
+    """Bump updated_at of the `model_cls` rows whose id is in `ids` (a list or a select), for
+    changes to related rows that their feed payload embeds"""
+    connection.execute(model_cls.__table__.update().where(model_cls.id.in_(ids))
+                       .values(updated_at=datetime.utcnow()))
+
+
+def ensure_updated_at_columns():
+    """Add, index and backfill updated_at on tracked tables created before change feeds existed.
+
+    create_all() never alters existing tables, so this runs at startup right after it.
+    """
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for model_cls in _tracked_models:
+            table = model_cls.__table__
+            if any(column['name'] == 'updated_at' for column in inspector.get_columns(table.name)):
+                continue
+            table_name = connection.dialect.identifier_preparer.format_table(table)
+            column_type = table.c.updated_at.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN updated_at {column_type}'))
+            backfill = func.coalesce(table.c.created_at, now) if 'created_at' in table.c else now
+            connection.execute(table.update().values(updated_at=backfill))
+            for index in table.indexes:
+                if 'updated_at' in index.columns:
+                    index.create(connection)
+
+
+def encode_cursor(timestamp, kind, object_id):
+    raw = f'{timestamp.isoformat()}|{kind}|{object_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, kind, object_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(kind), int(object_id)
+    except (ValueError, UnicodeError):
+        raise BadRequest('Invalid cursor')
+
+
+def _after_cursor(timestamp_col, id_col, kind, cursor):
+    # (timestamp_col, kind, id_col) > cursor, spelled out so the timestamp index is usable
+    timestamp, cursor_kind, cursor_id = cursor
+    if kind == cursor_kind:
+        tie_breaker = id_col > cursor_id
+    else:
+        tie_breaker = true() if kind > cursor_kind else false()
+    return or_(timestamp_col > timestamp, and_(timestamp_col == timestamp, tie_breaker))
+
+
+def change_feed_model(namespace, response_model):
+    return namespace.model(f'{response_model.name}Changes', {
+        'changes': fields.List(fields.Nested(namespace.model(f'{response_model.name}Change', {
+            'op': fields.String(description='`upsert` or `delete`'),
+            'id': fields.Integer(description='The ID of the changed object'),
+            'data': fields.Nested(response_model, allow_null=True, description='Current state, null for deletes'),
+        })), description='Changes in order'),
+        'next_cursor': fields.String(description='Pass as `since` to resume after the last change'),
+        'has_more': fields.Boolean(description='Whether more changes are available right now'),
+    })
+
+
+def change_feed(query, model_cls, response_model, mask=None):
+    """One ordered batch of rows updated, and objects deleted, after the ?since= cursor.
+
+    Timestamps are taken at flush, not commit, so a change can become visible after a
+    reader has moved past its timestamp. Changes younger than CHANGE_FEED_SAFETY_LAG
+    seconds are therefore held back; transactions must commit within that lag.
+    """
+    since = request.args.get('since')
+    limit = min(max(request.args.get('limit', DEFAULT_BATCH_SIZE, type=int), 1), MAX_BATCH_SIZE)
+    visible_before = datetime.utcnow() - timedelta(seconds=current_app.config['CHANGE_FEED_SAFETY_LAG'])
+
+    rows = query.options(undefer(model_cls.updated_at)) \
+        .filter(model_cls.updated_at.isnot(None), model_cls.updated_at < visible_before) \
+        .order_by(model_cls.updated_at, model_cls.id)
+    tombstones = Tombstone.query.filter_by(table_name=model_cls.__tablename__) \
+        .filter(Tombstone.deleted_at < visible_before) \
+        .order_by(Tombstone.deleted_at, Tombstone.object_id)
+    if since:
+        cursor = decode_cursor(since)
+        rows = rows.filter(_after_cursor(model_cls.updated_at, model_cls.id, _UPSERT, cursor))
+        tombstones = tombstones.filter(_after_cursor(Tombstone.deleted_at, Tombstone.object_id, _DELETE, cursor))
+
+    # Each stream is already ordered, so limit + 1 from both is enough to fill the batch and detect more
+    entries = [((row.updated_at, _UPSERT, row.id), row) for row in rows.limit(limit + 1)]
+    entries += [((tombstone.deleted_at, _DELETE, tombstone.object_id), None)
+                for tombstone in tombstones.limit(limit + 1)]
+    entries.sort(key=lambda entry: entry[0])
+    batch = entries[:limit]
+
+    changes = [{'op': 'upsert' if row is not None else 'delete',
+                'id': key[2],
+                'data': marshal(row, response_model, mask=mask) if row is not None else None}
+               for key, row in batch]
+    return {
+        'changes': changes,
+        'next_cursor': encode_cursor(*batch[-1][0]) if batch else since,
+        'has_more': len(entries) > limit,
+    }
@@ -0,0 +1,91 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli  # Optional: only offered when installed
+except ImportError:
+    brotli = None
+
+
+class Compress:
+    """Negotiated gzip/brotli compression for responses.
+
+    Bodies smaller than COMPRESS_MIN_SIZE are sent as-is. Compressed bodies
+    are kept in a small LRU keyed by encoding, level and a hash of the identity
+    body, so repeated responses are compressed only once. View ETags are never
+    trusted as a cache key: weak or reused ETags don't promise identical bytes.
+    """
+
+    def __init__(self, app=None):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIMETYPES', ['application/json', 'text/html', 'text/plain',
+                                                     'text/css', 'application/javascript'])
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)  # bytes
+        app.config.setdefault('COMPRESS_LEVEL', 6)  # gzip, 1-9
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)  # brotli, 0-11
+        app.config.setdefault('COMPRESS_CACHE_SIZE', 128)  # precompressed bodies kept per worker, 0 disables
+        self.app = app
+        app.after_request(self.after_request)
+
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def level(self, encoding):
+        return self.app.config['COMPRESS_BR_LEVEL' if encoding == 'br' else 'COMPRESS_LEVEL']
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.level(encoding))
+        return gzip.compress(body, compresslevel=self.level(encoding), mtime=0)
+
+    def _cached_compress(self, body, body_hash, encoding):
+        cache_size = self.app.config['COMPRESS_CACHE_SIZE']
+        if not cache_size:
+            return self.compress(body, encoding)
+
+        key = (encoding, self.level(encoding), body_hash)
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                return compressed
+
+        compressed = self.compress(body, encoding)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+    def after_request(self, response):
+        config = self.app.config
+        if (response.direct_passthrough
+                or not 200 <= response.status_code < 300
+                or response.status_code == 204
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in config['COMPRESS_MIMETYPES']):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if not encoding or response.content_length is None or response.content_length < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        body = response.get_data()
+        body_hash = hashlib.sha1(body).hexdigest()  # Far cheaper than compressing the body again
+        etag, weak = response.get_etag()
+        if etag is None:
+            etag, weak = body_hash, False
+
+        response.set_data(self._cached_compress(body, body_hash, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{etag}-{encoding}', weak)  # Each encoding is a distinct representation
+        return response
@@ -1,7 +1,8 @@
 from flask_restx import Api
-from werkzeug.exceptions import BadRequest, NotFound
+from werkzeug.exceptions import BadRequest, NotFound, NotImplemented as HTTPNotImplemented
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended.exceptions import NoAuthorizationError, JWTExtendedException
+from utils.mail_queue import MailQueueFull
 import jwt  # Import the jwt module for DecodeError and ExpiredSignatureError
 
 api = Api()  # Define your Api instance
@@ -12,6 +13,9 @@ def handle_bad_request(e):
 def handle_not_found(e):
     return {'message': 'Resource not found: {}'.format(e.description)}, 404
 
+def handle_not_implemented(e):
+    return {'message': 'Not implemented: {}'.format(e.description)}, 501
+
 def handle_internal_server_error(e):
     return {'message': 'An unexpected error occurred'}, 500
 
@@ -30,12 +34,17 @@ def handle_jwt_decode_error(e):
 def handle_jwt_expired_signature_error(e):
     return {'message': 'Token has expired'}, 401
 
+def handle_mail_queue_full(e):
+    return {'message': str(e)}, 503
+
 def register_error_handlers(api):
     api.errorhandler(BadRequest)(handle_bad_request)
     api.errorhandler(NotFound)(handle_not_found)
+    api.errorhandler(HTTPNotImplemented)(handle_not_implemented)
     api.errorhandler(SQLAlchemyError)(handle_sqlalchemy_error)
     api.errorhandler(NoAuthorizationError)(handle_no_authorization_error)
     api.errorhandler(JWTExtendedException)(handle_jwt_extended_exception)
     api.errorhandler(jwt.exceptions.DecodeError)(handle_jwt_decode_error)
     api.errorhandler(jwt.exceptions.ExpiredSignatureError)(handle_jwt_expired_signature_error)
+    api.errorhandler(MailQueueFull)(handle_mail_queue_full)
     api.errorhandler(Exception)(handle_internal_server_error)
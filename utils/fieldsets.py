@@ -0,0 +1,42 @@
+from flask import request
+from sqlalchemy import Column, inspect
+from sqlalchemy.orm import load_only, selectinload
+from werkzeug.exceptions import BadRequest
+
+FIELDS_PARAM_DESCRIPTION = 'Comma-separated list of fields to return (default: all)'
+
+
+def requested_fields(response_model, optional=()):
+    """Names from the ?fields= query parameter, validated against the response model.
+
+    Without the parameter every field is returned except the `optional` ones,
+    which have to be asked for explicitly.
+    """
+    raw_fields = request.args.get('fields')
+    if not raw_fields:
+        return [name for name in response_model if name not in optional]
+
+    fields = [name.strip() for name in raw_fields.split(',') if name.strip()]
+    if not fields:
+        raise BadRequest('No fields requested')
+    unknown_fields = set(fields) - set(response_model)
+    if unknown_fields:
+        raise BadRequest(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+    return fields
+
+
+def fieldset_options(model_cls, fields):
+    """Loader options that read only the requested columns and eager-load only the requested relationships"""
+    mapper = inspect(model_cls)
+    # Plain table columns only; query expressions such as Post.excerpt are populated by the caller
+    columns = [prop.class_attribute for prop in mapper.column_attrs
+               if isinstance(prop.expression, Column) and (prop.key in fields or prop.expression.primary_key)]
+    options = [load_only(*columns)]
+    options += [selectinload(mapper.relationships[name].class_attribute)
+                for name in fields if name in mapper.relationships]
+    return options
+
+
+def fieldset_mask(fields):
+    # flask-restx mask so marshalling never touches (and lazily loads) unrequested attributes
+    return ','.join(fields)
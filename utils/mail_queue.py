@@ -0,0 +1,156 @@
+import atexit
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from flask_mail import Message
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MailQueueFull(Exception):
+    pass
+
+
+class MailQueue:
+    """Sends Flask-Mail messages from a background thread.
+
+    Requests call `send` / `send_message`, which only enqueue and return. The
+    worker drains up to MAIL_QUEUE_BATCH_SIZE messages at a time over one SMTP
+    connection, keeps that connection open for MAIL_QUEUE_IDLE_TIMEOUT seconds
+    of inactivity, and retries failed sends with exponential backoff. The queue
+    is bounded by MAIL_QUEUE_MAXSIZE; `send` raises MailQueueFull when it is full.
+
+    Each (gunicorn) worker process starts its own thread on first use, and
+    `shutdown` runs at process exit so mail still queued is sent first (waiting
+    at most MAIL_QUEUE_SHUTDOWN_TIMEOUT seconds). To try it
+    locally, point MAIL_SERVER/MAIL_PORT at a debugging server such as
+    ``python -m aiosmtpd -n -l localhost:1025`` with MAIL_USE_TLS off.
+    """
+
+    def __init__(self, mail, app=None):
+        self.mail = mail
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_QUEUE_MAXSIZE', 1000)
+        app.config.setdefault('MAIL_QUEUE_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_QUEUE_MAX_RETRIES', 3)
+        app.config.setdefault('MAIL_QUEUE_RETRY_BACKOFF', 2.0)  # seconds, doubled after every failed attempt
+        app.config.setdefault('MAIL_QUEUE_IDLE_TIMEOUT', 30.0)  # seconds before an unused connection is closed
+        app.config.setdefault('MAIL_QUEUE_SHUTDOWN_TIMEOUT', 30.0)  # seconds to flush the queue at exit
+        self.app = app
+        app.extensions['mail_queue'] = self
+
+    def send(self, message):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            raise MailQueueFull('Mail queue is full, try again later')
+
+    def send_message(self, *args, **kwargs):
+        self.send(Message(*args, **kwargs))
+
+    def join(self):
+        """Block until every queued message has been sent or given up on"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def shutdown(self, timeout=None):
+        """Send everything already queued, then stop the worker"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return
+        if timeout is None:
+            timeout = self.app.config['MAIL_QUEUE_SHUTDOWN_TIMEOUT']
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error('Mail queue still full at shutdown; %d messages dropped', self._queue.qsize())
+            return
+        self._thread.join(timeout)
+
+    def _ensure_worker(self):
+        # Threads don't survive fork, so every process gets its own queue and worker
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    atexit.register(self.shutdown)  # Once per process; the worker is a daemon thread
+                self._queue = queue.Queue(maxsize=self.app.config['MAIL_QUEUE_MAXSIZE'])
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name='mail-queue', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _run(self, messages):
+        config = self.app.config
+        connection = None
+        with self.app.app_context():  # Flask-Mail needs the app for config and signals
+            while True:
+                try:
+                    batch = [messages.get(timeout=config['MAIL_QUEUE_IDLE_TIMEOUT'])]
+                except queue.Empty:
+                    connection = self._close(connection)
+                    continue
+                while len(batch) < config['MAIL_QUEUE_BATCH_SIZE']:
+                    try:
+                        batch.append(messages.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stopping = False
+                for message in batch:
+                    if message is _STOP:
+                        stopping = True
+                    else:
+                        connection = self._deliver(connection, message)
+                    messages.task_done()
+                if stopping:
+                    # Anything enqueued behind the stop marker still goes out
+                    while True:
+                        try:
+                            message = messages.get_nowait()
+                        except queue.Empty:
+                            break
+                        if message is not _STOP:
+                            connection = self._deliver(connection, message)
+                        messages.task_done()
+                    self._close(connection)
+                    return
+
+    def _deliver(self, connection, message):
+        config = self.app.config
+        for attempt in range(config['MAIL_QUEUE_MAX_RETRIES'] + 1):
+            try:
+                if connection is None:
+                    connection = self.mail.connect().__enter__()
+                connection.send(message)
+                return connection
+            except (smtplib.SMTPException, OSError) as e:
+                # The connection may be unusable now; reconnect on the next attempt
+                connection = self._close(connection)
+                if attempt == config['MAIL_QUEUE_MAX_RETRIES']:
+                    logger.error('Giving up on mail to %s after %d attempts: %s',
+                                 message.send_to, attempt + 1, e)
+                else:
+                    time.sleep(config['MAIL_QUEUE_RETRY_BACKOFF'] * 2 ** attempt)
+            except Exception:
+                logger.exception('Dropping mail to %s', message.send_to)
+                return connection
+        return connection
+
+    def _close(self, connection):
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+        return None
@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+WILDCARD = '*'
+_END = ''  # Trie terminal marker; never collides with a single-character key
+
+
+def _insert(trie, chars):
+    node = trie
+    for ch in chars:
+        node = node.setdefault(ch, {})
+    node[_END] = True
+
+
+def _has_prefix_in(trie, chars):
+    # True if any string stored in the trie is a prefix of `chars`
+    node = trie
+    for ch in chars:
+        node = node.get(ch)
+        if node is None:
+            return False
+        if _END in node:
+            return True
+    return False
+
+
+class PermissionMatcher:
+    """Compiled set of permission grants.
+
+    Permission names follow the ``resource_action`` convention. A grant is
+    either an exact name (``post_list``), a prefix wildcard (``post_*``), a
+    suffix wildcard (``*_list``) or ``*`` for everything. Prefix and suffix
+    grants are stored in tries, so ``matches`` costs O(len(name)) no matter
+    how many grants were compiled.
+    """
+
+    __slots__ = ('_exact', '_prefixes', '_suffixes', '_match_all')
+
+    def __init__(self, grants=()):
+        self._exact = set()
+        self._prefixes = {}
+        self._suffixes = {}  # Stored reversed so suffixes become prefixes
+        self._match_all = False
+        for grant in grants:
+            self.add(grant)
+
+    def add(self, grant):
+        if grant == WILDCARD:
+            self._match_all = True
+        elif grant.endswith(WILDCARD):
+            _insert(self._prefixes, grant[:-1])
+        elif grant.startswith(WILDCARD):
+            _insert(self._suffixes, reversed(grant[1:]))
+        else:
+            self._exact.add(grant)
+
+    def matches(self, permission_name):
+        if self._match_all or permission_name in self._exact:
+            return True
+        return (_has_prefix_in(self._prefixes, permission_name)
+                or _has_prefix_in(self._suffixes, reversed(permission_name)))
+
+
+class MatcherCache:
+    """Compiled matchers shared across requests, keyed by owner (e.g. a user ID).
+
+    A cached matcher is reused while the owner's grants `version` stays the
+    same and rebuilt otherwise. At most `maxsize` owners are kept, least
+    recently used first out.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (version, matcher)
+        self._lock = threading.Lock()
+
+    def get(self, key, version, load_grants):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        matcher = PermissionMatcher(load_grants())
+        with self._lock:
+            self._entries[key] = (version, matcher)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return matcher
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()